@@ -9,6 +9,7 @@ import json
 import re
 from typing import Dict, List, Optional, Tuple
 from config import config
+from utils.db_utils import invalidate_metadata_cache
 from utils.llm_utils import call_deepseek
 from tools import (
     PythonExecutorTool,
@@ -71,6 +72,12 @@ def parse_llm_response(response: str) -> Dict[str, Optional[str]]:
     return {"type": "none", "content": response.strip()}
 
 
+def _reset_db_caches():
+    """清空查询结果与表名/表结构缓存（工具为模块级单例，缓存会跨轮次存活）"""
+    invalidate_metadata_cache()
+    TOOL_DICT["db_query"].clear_cache()
+
+
 def execute_action(tool_name: str, params: Dict) -> str:
     if tool_name not in TOOL_DICT:
         return f"错误：未知工具 '{tool_name}'。"
@@ -81,6 +88,10 @@ def execute_action(tool_name: str, params: Dict) -> str:
         return tool.run(input_str)
     except Exception as e:
         return f"工具执行失败：{str(e)}"
+    finally:
+        # python_executor 代码可通过 get_connection() 直接改库/建表，之后的查询必须读最新数据
+        if tool_name == "python_executor":
+            _reset_db_caches()
 
 
 def run_react_agent(query: str, history: List[Dict[str, str]] = None,
@@ -92,6 +103,9 @@ def run_react_agent(query: str, history: List[Dict[str, str]] = None,
     if history is None:
         history = [{"role": "system", "content": SYSTEM_PROMPT}]
 
+    # 两轮对话之间数据库可能已变化，不复用上一轮的缓存
+    _reset_db_caches()
+
     history.append({"role": "user", "content": query})
 
     iteration = 0
@@ -8,19 +8,25 @@ from typing import List, Dict  # 修复：显式导入
 from utils.llm_utils import call_deepseek
 from .react_agent import run_react_agent
 
+# Fallback 分类关键词：包含任一关键词即视为 complex
+COMPLEX_KEYWORDS = ("数据库", "查询", "报告", "代码", "分析", "excel", "word")
+
+# 分类用系统提示（静态常量，保持请求前缀一致，便于 DeepSeek 前缀缓存命中）
+CLASSIFY_SYSTEM_PROMPT = "分类查询：'simple'（无需工具，直接回答）或 'complex'（需工具如DB/代码/报告）。仅输出分类词。"
+
 class TaskDispatcher:
     def __init__(self, conv_manager: "ConversationManager"):
         self.conv_manager = conv_manager
 
     def dispatch(self, user_query: str) -> str:
         # Fallback 分类：如果包含关键词如"数据库"、"报告"、"代码"，视为 complex
-        keywords_complex = ["数据库", "查询", "报告", "代码", "分析", "excel", "word"]
-        if any(word in user_query.lower() for word in keywords_complex):
+        query_lower = user_query.lower()
+        if any(word in query_lower for word in COMPLEX_KEYWORDS):
             classification = "complex"
         else:
             # 仅当不确定时调用 API 分类（减少调用次数）
             classify_prompt = [
-                {"role": "system", "content": "分类查询：'simple'（无需工具，直接回答）或 'complex'（需工具如DB/代码/报告）。仅输出分类词。"},
+                {"role": "system", "content": CLASSIFY_SYSTEM_PROMPT},
                 {"role": "user", "content": user_query}
             ]
             try:
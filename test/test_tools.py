@@ -19,6 +19,8 @@ from tools import (
     WordGeneratorTool,
     ExcelHandlerTool,
 )
+from docx import Document
+from openpyxl import load_workbook
 from config import config
 
 
@@ -72,6 +74,36 @@ print(df.describe())
     print("PythonExecutor pandas 测试实际返回结果：")
     print(result)
 
+    # 相同代码第二次执行命中编译缓存，结果一致
+    input_str = json.dumps({"code": "total = sum(range(5))\nprint(total)"})
+    first, second = tool.run(input_str), tool.run(input_str)
+    assert_true("10" in first and first == second, "python_executor cached code rerun")
+
+    # import（含别名 / __import__）在执行前被拒绝
+    for code in ["import os as _o\nprint('x')", "from os.path import join", "__import__('os')"]:
+        result = tool.run(json.dumps({"code": code}))
+        assert_true(result.startswith("错误：") and "不允许导入模块" in result, f"python_executor reject {code!r}")
+
+    # 只有 njit 可用（已安装 numba）时，描述中才提示使用 @njit
+    from tools.python_executor import ALLOWED_MODULES
+    assert_equal("@njit" in tool.description, "njit" in ALLOWED_MODULES, "python_executor njit hint matches numba")
+
+    # code 非字符串 / 无法解析：返回错误描述而不是抛出异常
+    for payload in ['{"code": ["a=1"]}', '{"code": null}', '[1]']:
+        result = tool.run(payload)
+        assert_true(result.startswith("错误：输入必须为JSON"), f"python_executor reject input {payload}")
+    result = tool.run(json.dumps({"code": "x = '\ud800'"}))
+    assert_true(result.startswith("代码无法解析"), "python_executor unparsable code")
+
+    # 多张图表按图序保存，文件均已写出
+    result = tool.run(json.dumps({"code": "for k in range(3):\n    plt.figure()\n    plt.plot([1, 2, k])"}))
+    chart_paths = [line for line in result.splitlines() if line.endswith(".png")]
+    assert_true([Path(p).name for p in chart_paths] == ["chart_1.png", "chart_2.png", "chart_3.png"],
+                "python_executor multi chart order")
+    assert_true(all(Path(p).exists() for p in chart_paths), "python_executor multi chart saved")
+    for p in chart_paths:
+        Path(p).unlink()  # 清理
+
     # 只在所有 assert 通过后打印 ALL PASS（修复原测试bug）
     print("test_python_executor: ALL PASS")
 
@@ -86,6 +118,21 @@ def test_db_query():
         assert_true("数据库表格列表" in result and isinstance(result, str), "db_query list_tables")
         print(f"表格列表预览: {result[:100]}...")
 
+        # get_schemas（批量），不存在的表单独列出
+        result = tool.run(json.dumps({"action": "get_schemas", "table_names": ["__no_such_table__"]}))
+        assert_true("未找到的表：__no_such_table__" in result, "db_query get_schemas missing table")
+
+        # 非字符串表名直接拒绝
+        result = tool.run(json.dumps({"action": "get_schemas", "table_names": ["a", 1]}))
+        assert_true(result.startswith("错误：get_schemas需要table_names列表"), "db_query get_schemas non-string")
+
+        # 表结构按请求顺序输出
+        from utils import get_tables
+        tables = get_tables()[:2]
+        if len(tables) == 2:
+            result = tool.run(json.dumps({"action": "get_schemas", "table_names": tables[::-1]}))
+            assert_true(result.index(f"`{tables[1]}`") < result.index(f"`{tables[0]}`"), "db_query get_schemas order")
+
         # query_data 基本（SELECT 1）
         result = tool.run(json.dumps({
             "action": "query_data",
@@ -94,6 +141,27 @@ def test_db_query():
         }))
         assert_true("总行数：1" in result or "test_col" in result, "db_query simple select")
 
+        # 已带 LIMIT / 结尾分号的 SQL 不再重复追加 LIMIT
+        result = tool.run(json.dumps({"action": "query_data", "sql": "select 1 AS test_col limit 1;"}))
+        assert_true("test_col" in result, "db_query existing limit")
+
+        # SQL 自带 LIMIT 时按 SQL 返回；显式 limit 更小时截断并注明
+        sql = "SELECT 1 AS n UNION ALL SELECT 2 UNION ALL SELECT 3 LIMIT 3"
+        result = tool.run(json.dumps({"action": "query_data", "sql": sql}))
+        assert_true("总行数：3，" in result, "db_query own limit respected")
+        result = tool.run(json.dumps({"action": "query_data", "sql": sql, "limit": 2}))
+        assert_true("总行数：2（结果超过 limit=2，已截断）" in result, "db_query explicit limit truncated")
+
+        # 统计摘要：数值列与文本列分别聚合
+        result = tool.run(json.dumps({"action": "query_data", "sql": "SELECT 1 AS num_col, 'x' AS text_col"}))
+        summary = result.split("统计摘要：\n")[-1]
+        assert_true(summary.startswith("|num_col|text_col") and "mean" in summary and "nunique" in summary,
+                    "db_query summary by dtype")
+
+        # 非 SELECT 直接拒绝
+        result = tool.run(json.dumps({"action": "query_data", "sql": "UPDATE t SET a = 1"}))
+        assert_equal(result, "错误：仅支持SELECT查询", "db_query reject non-select")
+
         print("test_db_query: ALL PASS")
     except Exception as e:
         print(f"test_db_query: SKIP (数据库连接失败: {str(e)})")
@@ -119,6 +187,10 @@ def test_word_generator():
     if "文件路径：" in result:
         file_path = Path(result.split("文件路径：")[-1].strip())
         assert_true(file_path.exists(), "word_generator file exists")
+        table = Document(str(file_path)).tables[0]
+        assert_equal(len(table.rows), 3, "word_generator table rows")
+        assert_equal(table.cell(1, 0).text, "张三", "word_generator table cell text")
+        assert_equal(table.cell(2, 1).text, "25", "word_generator table cell number")
         file_path.unlink()  # 清理
         print("生成的Word文件已清理")
 
@@ -151,6 +223,144 @@ def test_excel_handler():
         file_path.unlink()  # 清理
         print("生成的Excel文件已清理")
 
+    # create 模式（write_only）下 start_cell 偏移仍然生效
+    input_str = json.dumps({
+        "mode": "create",
+        "sheets": [{"sheet_name": "偏移", "data": [["产品", "销量"], ["A", 100]], "start_cell": "B3"}],
+        "output_filename": "test_excel_offset.xlsx"
+    })
+    result = tool.run(input_str)
+    file_path = Path(result.split("：")[-1].strip())
+    ws = load_workbook(str(file_path))["偏移"]
+    assert_equal(ws["B3"].value, "产品", "excel_handler start_cell offset header")
+    assert_equal(ws["C4"].value, 100, "excel_handler start_cell offset value")
+    assert_true(ws["A1"].value is None, "excel_handler start_cell offset blank")
+    file_path.unlink()
+
+    # 同名工作表多块写入（标题 + 表格）落在同一张表上
+    input_str = json.dumps({
+        "mode": "create",
+        "sheets": [
+            {"sheet_name": "报告", "data": [["销售汇总"]], "start_cell": "A1"},
+            {"sheet_name": "报告", "data": [["产品", "销量"], ["A", 100]], "start_cell": "A3"},
+        ],
+        "output_filename": "test_excel_blocks.xlsx"
+    })
+    result = tool.run(input_str)
+    file_path = Path(result.split("：")[-1].strip())
+    wb = load_workbook(str(file_path))
+    assert_equal(wb.sheetnames, ["报告"], "excel_handler repeated sheet single sheet")
+    assert_equal(wb["报告"]["A1"].value, "销售汇总", "excel_handler repeated sheet title")
+    assert_equal(wb["报告"]["B4"].value, 100, "excel_handler repeated sheet table")
+    file_path.unlink()
+
+    # Agent 经 json.dumps 转发的 NaN 仍可解析（orjson 不接受 NaN，需回退标准库）
+    input_str = json.dumps({
+        "sheets": [{"sheet_name": "缺失值", "data": [["产品", "销量"], ["A", float("nan")]]}],
+        "output_filename": "test_excel_nan.xlsx"
+    })
+    assert_true("NaN" in input_str, "excel_handler nan literal in input")
+    result = tool.run(input_str)
+    assert_true(result.startswith("Excel文件已生成"), "excel_handler nan input accepted")
+    file_path = Path(result.split("：")[-1].strip())
+    assert_equal(load_workbook(str(file_path))["缺失值"]["A2"].value, "A", "excel_handler nan input written")
+    file_path.unlink()
+
+    # 多字母列起始单元格
+    input_str = json.dumps({
+        "mode": "create",
+        "sheets": [{"sheet_name": "宽表", "data": [["产品", "销量"]], "start_cell": "AA2"}],
+        "output_filename": "test_excel_wide.xlsx"
+    })
+    result = tool.run(input_str)
+    file_path = Path(result.split("：")[-1].strip())
+    ws = load_workbook(str(file_path))["宽表"]
+    assert_equal(ws["AA2"].value, "产品", "excel_handler multi-letter start_cell")
+    assert_equal(ws["AB2"].value, "销量", "excel_handler multi-letter start_cell next col")
+    file_path.unlink()
+
+    # 绝对引用起始单元格
+    input_str = json.dumps({
+        "sheets": [{"sheet_name": "绝对引用", "data": [["产品"]], "start_cell": "$B$3"}],
+        "output_filename": "test_excel_absolute.xlsx"
+    })
+    result = tool.run(input_str)
+    file_path = Path(result.split("：")[-1].strip())
+    assert_equal(load_workbook(str(file_path))["绝对引用"]["B3"].value, "产品", "excel_handler absolute start_cell")
+    file_path.unlink()
+
+    # 超出工作表范围 / 格式错误的起始单元格被拒绝
+    for start_cell in ["A0", "XFE1", "A1048577", "1A"]:
+        result = tool.run(json.dumps({"sheets": [{"data": [["x"]], "start_cell": start_cell}],
+                                      "output_filename": "test_excel_bad_cell.xlsx"}))
+        assert_true(result.startswith("Excel处理错误：start_cell 无效"), f"excel_handler reject start_cell {start_cell}")
+
+    # 超过阈值走直写 XML 路径，结果仍可被 openpyxl 正常读取
+    import tools.excel_handler as excel_module
+    original_threshold = excel_module.FAST_XML_ROW_THRESHOLD
+    excel_module.FAST_XML_ROW_THRESHOLD = 1
+    try:
+        input_str = json.dumps({
+            "mode": "create",
+            "sheets": [{"sheet_name": "直写", "data": [["产品", "销量", "达标"], ["A&B", 100, True], ["C", 2.5, None]],
+                        "start_cell": "B2"}],
+            "output_filename": "test_excel_fast_xml.xlsx"
+        })
+        result = tool.run(input_str)
+        assert_true("Excel文件已生成" in result, "excel_handler fast xml basic")
+        file_path = Path(result.split("：")[-1].strip())
+        ws = load_workbook(str(file_path))["直写"]
+        assert_equal(ws["B2"].value, "产品", "excel_handler fast xml string")
+        assert_equal(ws["B3"].value, "A&B", "excel_handler fast xml escaped string")
+        assert_equal(ws["C3"].value, 100, "excel_handler fast xml int")
+        assert_equal(ws["C4"].value, 2.5, "excel_handler fast xml float")
+        assert_equal(ws["D3"].value, True, "excel_handler fast xml bool")
+
+        # 第二张表 start_cell 非法：返回错误，且不破坏同名的已有文件
+        input_str = json.dumps({
+            "sheets": [{"sheet_name": "好", "data": [["x"], ["y"]]},
+                       {"sheet_name": "坏", "data": [["z"], ["w"]], "start_cell": "1A"}],
+            "output_filename": "test_excel_fast_xml.xlsx"
+        })
+        result = tool.run(input_str)
+        assert_true(result.startswith("Excel处理错误"), "excel_handler fast xml bad start_cell")
+        assert_equal(load_workbook(str(file_path))["直写"]["B2"].value, "产品", "excel_handler fast xml old file intact")
+        assert_true(not file_path.with_name(file_path.name + ".tmp").exists(), "excel_handler fast xml tmp removed")
+        file_path.unlink()
+
+        # 仅大小写不同的表名视为重复，交给 openpyxl 处理，生成的文件仍可打开
+        input_str = json.dumps({
+            "sheets": [{"sheet_name": "Data", "data": [["a"]]}, {"sheet_name": "data", "data": [["b"]]}],
+            "output_filename": "test_excel_case.xlsx"
+        })
+        result = tool.run(input_str)
+        file_path = Path(result.split("：")[-1].strip())
+        sheetnames = load_workbook(str(file_path)).sheetnames
+        assert_equal(len({n.lower() for n in sheetnames}), 2, "excel_handler sheet names case-insensitive unique")
+        file_path.unlink()
+
+        # 以 = 开头的字符串与 openpyxl 路径一致，按公式写入
+        input_str = json.dumps({
+            "sheets": [{"sheet_name": "公式", "data": [["合计"], ["=1+1"]]}],
+            "output_filename": "test_excel_formula.xlsx"
+        })
+        result = tool.run(input_str)
+        file_path = Path(result.split("：")[-1].strip())
+        cell = load_workbook(str(file_path))["公式"]["A2"]
+        assert_true(cell.data_type == "f" and cell.value == "=1+1", "excel_handler fast xml formula")
+        file_path.unlink()
+
+        # 表名为 null 时不走直写路径，交给 openpyxl 处理
+        input_str = json.dumps({
+            "sheets": [{"sheet_name": None, "data": [["a"], ["b"]]}],
+            "output_filename": "test_excel_null_name.xlsx"
+        })
+        result = tool.run(input_str)
+        assert_true(result.startswith("Excel文件已生成"), "excel_handler null sheet name")
+        Path(result.split("：")[-1].strip()).unlink()
+    finally:
+        excel_module.FAST_XML_ROW_THRESHOLD = original_threshold
+
     print("test_excel_handler: ALL PASS")
 
 
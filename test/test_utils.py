@@ -52,6 +52,18 @@ def test_file_utils():
     assert_true(config.OUTPUT_DIR in path.parents, "get_output_path in outputs")
     assert_equal(path.name, "test.txt", "get_output_path filename")
 
+    # 路径规范化（.. 被折叠）
+    path = get_output_path("test_dir/../test_norm.txt")
+    assert_equal(path, get_output_path("test_norm.txt"), "get_output_path normalized")
+
+    # 目录在运行中被删除后，再次获取路径时重新创建
+    path = get_output_path("test_dir/subdir/test.txt")
+    path.parent.rmdir()
+    path = get_output_path("test_dir/subdir/test.txt")
+    assert_true(path.parent.is_dir(), "get_output_path recreates removed dir")
+    path.parent.rmdir()
+    path.parent.parent.rmdir()
+
     # df_to_table_data (pandas)
     df = pd.DataFrame({
         "name": ["Alice", "Bob", None],
@@ -4,8 +4,29 @@
 所有工具继承此基类，提供统一接口，便于Agent注册和调用
 """
 
+import json
 from abc import ABC, abstractmethod
 
+try:
+    import orjson  # 可选依赖：Rust 实现的 JSON 解析，更快
+except ImportError:
+    orjson = None
+
+
+def json_loads(data):
+    """
+    解析工具输入JSON：优先 orjson，未安装或解析失败时回退标准库
+    （Agent 用 json.dumps 转发参数，可能含 orjson 不接受的 NaN/Infinity）
+    解析失败抛出 json.JSONDecodeError
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
 class BaseTool(ABC):
     name: str
     description: str
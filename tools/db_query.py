@@ -1,15 +1,47 @@
 # tools/db_query.py
 """
 数据库查询工具（优化大数据：默认limit + 摘要）
-支持三种操作：list_tables, get_schema, query_data
+支持四种操作：list_tables, get_schema, get_schemas（批量）, query_data
 query_data：返回样本 + pandas摘要（避免全数据浪费token）
 """
 
 import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
-from utils.db_utils import get_tables, get_table_schema, execute_query
-from utils.file_utils import df_to_table_data
-from tools.base_tool import BaseTool
+from utils.db_utils import get_tables, get_table_schema, get_all_schemas, execute_query
+from tools.base_tool import BaseTool, json_loads
+
+# 预编译：只匹配开头关键字 / 结尾 LIMIT 子句，无需对整条 SQL 做 upper() 拷贝
+_SELECT_RE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+_LIMIT_RE = re.compile(r"\bLIMIT\s+\d+(?:\s*,\s*\d+|\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+
+# 统计摘要：数值列 / 非数值列各自只计算需要的指标
+_NUMERIC_STATS = ["count", "mean", "std", "min", "max"]
+_OTHER_STATS = ["count", "nunique"]
+
+
+def _format_table(df: pd.DataFrame, index: bool = False) -> str:
+    """DataFrame 转 '|' 分隔文本（pandas 一次性写出，缺失值为空串）"""
+    return df.to_csv(sep="|", index=index, lineterminator="\n").rstrip("\n")
+
+
+def _summarize(df: pd.DataFrame) -> pd.DataFrame:
+    """按列类型分别聚合后横向拼接一次（数值列在前），替代 describe(include='all')"""
+    parts = []
+    num_df = df.select_dtypes("number")
+    if len(num_df.columns):
+        parts.append(num_df.agg(_NUMERIC_STATS))
+    other_df = df.select_dtypes(exclude="number")
+    if len(other_df.columns):
+        parts.append(other_df.agg(_OTHER_STATS))
+    return pd.concat(parts, axis=1)
+
+
+def _format_schema(table_name: str, schema: List[Dict[str, Any]]) -> str:
+    lines = [f"- {col['Field']}: {col['Type']} ({'NULL' if col['Null']=='YES' else 'NOT NULL'})" for col in schema]
+    return f"表 `{table_name}` 结构：\n" + "\n".join(lines)
+
 
 class DBQueryTool(BaseTool):
     name = "db_query"
@@ -17,11 +49,20 @@ class DBQueryTool(BaseTool):
 输入JSON: 
 - {"action": "list_tables"}
 - {"action": "get_schema", "table_name": "xxx"}
+- {"action": "get_schemas", "table_names": ["xxx", "yyy"]}（多张表一次查询，优先使用）
 - {"action": "query_data", "sql": "SELECT ...", "limit": 100 (可选，默认100)}"""
 
+    def __init__(self):
+        # 单槽缓存：ReAct 循环中常重复发出相同查询，(sql, max_rows) 相同时直接复用上次结果
+        self._last_query: Optional[Tuple[Tuple[str, Optional[int]], str]] = None
+
+    def clear_cache(self):
+        """丢弃缓存的查询结果（每轮对话开始、或其他工具可能改写数据库后调用）"""
+        self._last_query = None
+
     def run(self, input_str: str) -> str:
         try:
-            data = json.loads(input_str)
+            data = json_loads(input_str)
             action = data["action"]
         except (json.JSONDecodeError, KeyError):
             return "错误：输入必须为JSON，且包含'action'字段"
@@ -35,32 +76,61 @@ class DBQueryTool(BaseTool):
             if not table_name:
                 return "错误：get_schema需要table_name"
             schema = get_table_schema(table_name)
-            lines = [f"- {col['Field']}: {col['Type']} ({'NULL' if col['Null']=='YES' else 'NOT NULL'})" for col in schema]
-            return f"表 `{table_name}` 结构：\n" + "\n".join(lines)
+            return _format_schema(table_name, schema)
+
+        elif action == "get_schemas":
+            table_names = data.get("table_names")
+            if (not table_names or not isinstance(table_names, list)
+                    or not all(isinstance(name, str) for name in table_names)):
+                return "错误：get_schemas需要table_names列表（元素为表名字符串）"
+            table_names = list(dict.fromkeys(table_names))  # 去重，保持请求顺序
+            schemas = get_all_schemas(table_names)
+            # 表名优先精确匹配，再不区分大小写匹配（lower_case_table_names=1 时库中表名为小写）
+            by_lower = {name.lower(): name for name in schemas}
+            parts, missing = [], []
+            for name in table_names:
+                actual = name if name in schemas else by_lower.get(name.lower())
+                if actual is None:
+                    missing.append(name)
+                else:
+                    parts.append(_format_schema(actual, schemas[actual]))
+            if missing:
+                parts.append("未找到的表：" + ", ".join(missing))
+            return "\n\n".join(parts)
 
         elif action == "query_data":
-            sql = data.get("sql", "").strip()
+            sql = data.get("sql", "").strip().rstrip(";").rstrip()
             limit = int(data.get("limit", 100))
-            if not sql.upper().startswith("SELECT"):
+            if not _SELECT_RE.match(sql):
                 return "错误：仅支持SELECT查询"
-            sql = sql if sql.upper().endswith("LIMIT") else f"{sql} LIMIT {limit}"
+            has_limit = bool(_LIMIT_RE.search(sql))
+            sql = sql if has_limit else f"{sql} LIMIT {limit}"
+            # SQL 自带 LIMIT 且未显式传 limit：按 SQL 本身返回；否则最多取 limit 行（多取 1 行判断是否截断）
+            max_rows = None if has_limit and "limit" not in data else limit + 1
+
+            cache_key = (sql, max_rows)
+            if self._last_query is not None and self._last_query[0] == cache_key:
+                return self._last_query[1]
 
             try:
-                raw_data = execute_query(sql)
+                raw_data = execute_query(sql, max_rows=max_rows)
                 if not raw_data:
                     return "查询无结果"
-                df = pd.DataFrame(raw_data)
+                truncated = len(raw_data) > limit and max_rows is not None
+                df = pd.DataFrame(raw_data[:limit] if truncated else raw_data)
+                row_count = f"{len(df)}（结果超过 limit={limit}，已截断）" if truncated else len(df)
 
                 # 样本 + 摘要（大数据优化）
                 head = df.head(10)
                 tail = df.tail(10) if len(df) > 20 else pd.DataFrame()
-                summary = df.describe(include='all').fillna("").astype(str)
+                summary = _summarize(df)
 
-                result = f"查询结果（总行数：{len(df)}，显示样本）:\n\n前10行：\n"
-                result += "\n".join([" | ".join(map(str, row)) for row in df_to_table_data(head)])
+                result = f"查询结果（总行数：{row_count}，显示样本）:\n\n前10行：\n"
+                result += _format_table(head)
                 if not tail.empty:
-                    result += "\n\n后10行：\n" + "\n".join([" | ".join(map(str, row)) for row in df_to_table_data(tail)])
-                result += "\n\n统计摘要：\n" + "\n".join([" | ".join(map(str, row)) for row in df_to_table_data(summary)])
+                    result += "\n\n后10行：\n" + _format_table(tail)
+                result += "\n\n统计摘要：\n" + _format_table(summary, index=True)
+                self._last_query = (cache_key, result)
                 return result
             except Exception as e:
                 return f"查询执行错误：{str(e)}"
@@ -2,14 +2,72 @@
 """
 Excel处理工具（支持新建/补全模板，适合大数据写入）
 mode: create/update
+- create：openpyxl write_only 模式逐行写入（不在内存中保留整张表）
+- update：加载模板后按单元格写入
+- create 且总行数超过 FAST_XML_ROW_THRESHOLD：跳过 openpyxl，直接流式写出 xlsx 的 XML/ZIP
 大数据建议结合python_executor更灵活
 """
 
 import json
+import math
+import os
+import re
+import zipfile
+from typing import Any, Dict, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
 from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import coordinate_to_tuple, get_column_letter
 from utils.file_utils import get_output_path, df_to_table_data
-from tools.base_tool import BaseTool
+from tools.base_tool import BaseTool, json_loads
+
+# create 模式总行数超过该阈值时走直写 XML 路径
+FAST_XML_ROW_THRESHOLD = 50000
+
+# 工作表最大行/列数（XFD1048576）
+_MAX_ROW = 1048576
+_MAX_COL = 16384
+
+# XML 1.0 不允许的控制字符（写入前剔除）
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Excel 工作表名不允许的字符
+_INVALID_SHEET_NAME_CHARS = re.compile(r"[\\*?:/\[\]]")
+
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ROOT_RELS = (
+    f'{_XML_HEADER}<Relationships xmlns="{_NS_PKG_REL}">'
+    f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_STYLES = (
+    f'{_XML_HEADER}<styleSheet xmlns="{_NS_MAIN}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _xml_cell(ref: str, value: Any) -> str:
+    """单个单元格的 <c> 元素；None 返回空串（不写该单元格）；以 = 开头的字符串按公式写入（与 openpyxl 一致）"""
+    if value is None:
+        return ""
+    if isinstance(value, str) and len(value) > 1 and value.startswith("="):
+        return f'<c r="{ref}"><f>{escape(_ILLEGAL_XML_CHARS.sub("", value[1:]))}</f></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int) or (isinstance(value, float) and math.isfinite(value)):
+        return f'<c r="{ref}"><v>{value!r}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
 
 class ExcelHandlerTool(BaseTool):
     name = "excel_handler"
@@ -23,7 +81,7 @@ class ExcelHandlerTool(BaseTool):
 
     def run(self, input_str: str) -> str:
         try:
-            data = json.loads(input_str)
+            data = json_loads(input_str)
             mode = data.get("mode", "create")
             template_path = data.get("template_path")
             sheets = data.get("sheets", [])
@@ -34,30 +92,146 @@ class ExcelHandlerTool(BaseTool):
         try:
             if mode == "update" and template_path:
                 wb = load_workbook(template_path)
-            else:
+                self._write_cells(wb, sheets)
+            elif self._has_repeated_sheet(sheets):
+                # 同一工作表分多块写入（如 A1 标题 + A3 表格）：write_only 只能顺序追加，改为按单元格写入
                 wb = Workbook()
                 wb.remove(wb.active)  # 清空默认sheet
-
-            for sheet_info in sheets:
-                sheet_name = sheet_info.get("sheet_name", "Sheet1")
-                table_data = sheet_info.get("data", [])
-                start_cell = sheet_info.get("start_cell", "A1")
-
-                if sheet_name not in wb.sheetnames:
-                    ws = wb.create_sheet(sheet_name)
-                else:
-                    ws = wb[sheet_name]
-
-                # 写入数据
-                start_row = int(''.join(filter(str.isdigit, start_cell))) or 1
-                start_col = ord(start_cell.upper()[0]) - ord('A') + 1 if start_cell[0].isalpha() else 1
-
-                for r_idx, row in enumerate(table_data):
-                    for c_idx, value in enumerate(row):
-                        ws.cell(row=start_row + r_idx, column=start_col + c_idx, value=value)
+                self._write_cells(wb, sheets)
+            elif self._use_fast_xml(sheets):
+                # 超大数据：不经过 openpyxl 对象模型，直接写 XML
+                # 先写临时文件再替换，中途出错（如 start_cell 非法）不会留下损坏文件或覆盖同名旧文件
+                output_path = get_output_path(output_filename)
+                tmp_path = output_path.with_name(output_path.name + ".tmp")
+                try:
+                    self._save_xml(str(tmp_path), sheets)
+                    os.replace(tmp_path, output_path)
+                finally:
+                    tmp_path.unlink(missing_ok=True)
+                return f"Excel文件已生成：{output_path}"
+            else:
+                # 新建：write_only 模式逐行流式写入，内存占用与行数无关
+                wb = Workbook(write_only=True)
+                self._append_rows(wb, sheets)
 
             output_path = get_output_path(output_filename)
             wb.save(str(output_path))
             return f"Excel文件已{'更新' if mode=='update' else '生成'}：{output_path}"
         except Exception as e:
-            return f"Excel处理错误：{str(e)}"
\ No newline at end of file
+            return f"Excel处理错误：{str(e)}"
+
+    @staticmethod
+    def _parse_start_cell(start_cell: str) -> Tuple[int, int]:
+        """解析起始单元格（支持多字母列如 AA1、绝对引用 $B$3），返回 (start_row, start_col)"""
+        error = f"start_cell 无效：{start_cell!r}（应为 A1 ~ XFD1048576 范围内的单元格）"
+        try:
+            start_row, start_col = coordinate_to_tuple(str(start_cell).replace("$", ""))
+        except ValueError:
+            raise ValueError(error) from None
+        if not (1 <= start_row <= _MAX_ROW and 1 <= start_col <= _MAX_COL):
+            raise ValueError(error)
+        return start_row, start_col
+
+    def _write_cells(self, wb, sheets: List[Dict[str, Any]]):
+        """补全模板：按单元格随机写入（保留模板原有内容与格式）"""
+        for sheet_info in sheets:
+            sheet_name = sheet_info.get("sheet_name", "Sheet1")
+            table_data = sheet_info.get("data", [])
+            start_row, start_col = self._parse_start_cell(sheet_info.get("start_cell", "A1"))
+
+            if sheet_name not in wb.sheetnames:
+                ws = wb.create_sheet(sheet_name)
+            else:
+                ws = wb[sheet_name]
+
+            for r_idx, row in enumerate(table_data):
+                for c_idx, value in enumerate(row):
+                    ws.cell(row=start_row + r_idx, column=start_col + c_idx, value=value)
+
+    def _append_rows(self, wb, sheets: List[Dict[str, Any]]):
+        """新建：write_only 工作表只能顺序追加，start_cell 偏移用前置空行/空列表示"""
+        for sheet_info in sheets:
+            sheet_name = sheet_info.get("sheet_name", "Sheet1")
+            table_data = sheet_info.get("data", [])
+            start_row, start_col = self._parse_start_cell(sheet_info.get("start_cell", "A1"))
+
+            ws = wb.create_sheet(sheet_name)
+            for _ in range(start_row - 1):
+                ws.append([])
+            col_padding = [None] * (start_col - 1)
+            for row in table_data:
+                ws.append(col_padding + list(row))
+
+    @staticmethod
+    def _has_repeated_sheet(sheets: List[Dict[str, Any]]) -> bool:
+        """是否有多个条目写入同名工作表"""
+        names = [s.get("sheet_name", "Sheet1") for s in sheets]
+        return len(set(names)) != len(names)
+
+    @staticmethod
+    def _use_fast_xml(sheets: List[Dict[str, Any]]) -> bool:
+        """
+        总行数超过阈值，且工作表名合法、不重复时走直写 XML 路径（否则交给 openpyxl 校验/处理）
+        Excel 工作表名不区分大小写，"Data" 与 "data" 视为重复
+        """
+        if sum(len(s.get("data", [])) for s in sheets) <= FAST_XML_ROW_THRESHOLD:
+            return False
+        names = [s.get("sheet_name", "Sheet1") for s in sheets]
+        if not all(isinstance(n, str) for n in names):
+            return False
+        return len({n.lower() for n in names}) == len(names) and all(
+            0 < len(n) <= 31 and not _INVALID_SHEET_NAME_CHARS.search(n) for n in names
+        )
+
+    def _save_xml(self, output_path: str, sheets: List[Dict[str, Any]]):
+        """直接生成 xlsx（ZIP + SpreadsheetML），单元格一律使用 inlineStr/数值，无共享字符串表"""
+        n = len(sheets)
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("[Content_Types].xml", (
+                f'{_XML_HEADER}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                '<Override PartName="/xl/workbook.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                '<Override PartName="/xl/styles.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                + "".join(
+                    f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                    for i in range(1, n + 1)
+                )
+                + '</Types>'
+            ))
+            zf.writestr("_rels/.rels", _ROOT_RELS)
+            zf.writestr("xl/workbook.xml", (
+                f'{_XML_HEADER}<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>'
+                + "".join(
+                    f'<sheet name={quoteattr(s.get("sheet_name", "Sheet1"))} '
+                    f'sheetId="{i}" r:id="rId{i}"/>'
+                    for i, s in enumerate(sheets, start=1)
+                )
+                + '</sheets></workbook>'
+            ))
+            zf.writestr("xl/_rels/workbook.xml.rels", (
+                f'{_XML_HEADER}<Relationships xmlns="{_NS_PKG_REL}">'
+                + "".join(
+                    f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                    for i in range(1, n + 1)
+                )
+                + f'<Relationship Id="rId{n + 1}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+                '</Relationships>'
+            ))
+            zf.writestr("xl/styles.xml", _STYLES)
+
+            for i, sheet_info in enumerate(sheets, start=1):
+                table_data = sheet_info.get("data", [])
+                start_row, start_col = self._parse_start_cell(sheet_info.get("start_cell", "A1"))
+                width = max((len(row) for row in table_data), default=0)
+                letters = [get_column_letter(start_col + c) for c in range(width)]
+
+                with zf.open(f"xl/worksheets/sheet{i}.xml", "w") as f:
+                    f.write(f'{_XML_HEADER}<worksheet xmlns="{_NS_MAIN}"><sheetData>'.encode("utf-8"))
+                    for r_idx, row in enumerate(table_data, start=start_row):
+                        cells = "".join(_xml_cell(f"{letters[c]}{r_idx}", v) for c, v in enumerate(row))
+                        f.write(f'<row r="{r_idx}">{cells}</row>'.encode("utf-8"))
+                    f.write(b'</sheetData></worksheet>')
@@ -7,22 +7,38 @@
    - 测试代码已调整为无 import。
 2. 增强安全性：保持无 __import__，用户代码不能动态 import 新模块，只用预定义 ALLOWED_MODULES。
 3. 输出格式微调：确保 result 包含关键字符串，便于测试匹配。
+4. 执行前 AST 静态检查：import / from ... import / __import__() / importlib.import_module()
+   （含别名写法）直接拒绝并给出明确提示，避免执行到一半才报 ImportError。
+5. 通过检查的代码按哈希 LRU 缓存编译结果（code object），Agent 重试相同代码时跳过解析/检查/编译。
+6. 可选 numba：已安装时提供 njit/prange，数值循环可 JIT 编译为机器码。
+7. 图表：固定 Agg 无界面后端，保存后按编号逐个关闭。
 """
 
+import ast
 import sys
 import io
 import json
+import hashlib
 import traceback
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict
+from types import CodeType
+from typing import Dict, Optional, Union
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # 只输出图片文件：固定无界面后端，必须在导入 pyplot 之前设置
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from utils.db_utils import get_connection, execute_query
 from utils.file_utils import get_output_path
-from tools.base_tool import BaseTool
+from tools.base_tool import BaseTool, json_loads
 from config import config
 
+try:
+    import numba  # 可选依赖：数值循环 JIT 加速
+except ImportError:
+    numba = None
+
 # 安全内置函数白名单（无 __import__，防止动态导入风险模块）
 SAFE_BUILTINS = {
     'print': print,
@@ -60,23 +76,84 @@ ALLOWED_MODULES = {
     'Path': Path,
     'config': config,
 }
+if numba is not None:
+    ALLOWED_MODULES.update({'njit': numba.njit, 'prange': numba.prange})
+
+# 编译结果缓存容量（条）
+CODE_CACHE_SIZE = 64
+
+
+def _check_code_safety(tree: ast.AST) -> Optional[str]:
+    """
+    AST 静态检查（单次遍历语法树，不受字符串/注释中同名文本干扰）
+    返回违规描述；检查通过返回 None
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return f"第{node.lineno}行包含 import 语句"
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name) and func.id == "__import__":
+                return f"第{node.lineno}行调用了 __import__()"
+            if (isinstance(func, ast.Attribute) and func.attr == "import_module"
+                    and isinstance(func.value, ast.Name) and func.value.id == "importlib"):
+                return f"第{node.lineno}行调用了 importlib.import_module()"
+    return None
 
 
 class PythonExecutorTool(BaseTool):
     name = "python_executor"
     description = """执行安全的Python数据分析代码。
 输入为JSON: {"code": "完整代码字符串"}
-无需 import，直接使用预导入模块如 pandas.DataFrame(...), plt.plot(), load_workbook() 等（完整列表见ALLOWED_MODULES）。
+无需 import（含 import 的代码会被直接拒绝），直接使用预导入模块如 pandas.DataFrame(...), plt.plot(), load_workbook() 等（完整列表见ALLOWED_MODULES）。
 代码可处理大数据、字段匹配、Excel补全、绘图。
 输出会捕获print内容和生成的文件路径。"""
+    if numba is not None:
+        description += "\n纯数值循环可用 @njit 装饰的函数加速（可配合 prange 并行；不支持 cache=True）。"
+
+    def __init__(self):
+        # 代码哈希 -> 已通过检查的 code object（LRU）
+        self._code_cache: "OrderedDict[str, CodeType]" = OrderedDict()
+
+    def _compile_code(self, code: str) -> Union[CodeType, str]:
+        """解析 + 静态检查 + 编译，返回 code object；语法错误或包含导入时返回错误描述"""
+        key = hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        code_obj = self._code_cache.get(key)
+        if code_obj is not None:
+            self._code_cache.move_to_end(key)
+            return code_obj
+
+        try:
+            tree = ast.parse(code)
+            violation = _check_code_safety(tree)
+            if violation:
+                return f"错误：{violation}，不允许导入模块。请直接使用预导入对象：{', '.join(ALLOWED_MODULES)}"
+            code_obj = compile(tree, "<string>", "exec")
+        except SyntaxError as e:
+            return f"代码语法错误：{e.msg}（第{e.lineno}行）"
+        except (ValueError, MemoryError, RecursionError) as e:
+            # 源码含空字符、嵌套过深等，解析/编译阶段即失败
+            return f"代码无法解析：{type(e).__name__}: {e}"
+
+        self._code_cache[key] = code_obj
+        if len(self._code_cache) > CODE_CACHE_SIZE:
+            self._code_cache.popitem(last=False)
+        return code_obj
 
     def run(self, input_str: str) -> str:
         try:
-            data = json.loads(input_str)
+            data = json_loads(input_str)
             code = data["code"]
-        except (json.JSONDecodeError, KeyError):
+            if not isinstance(code, str):
+                raise TypeError("code 必须为字符串")
+        except (json.JSONDecodeError, KeyError, TypeError):
             return "错误：输入必须为JSON，且包含'code'字段（完整Python代码）"
 
+        # 执行前静态检查：语法错误或导入模块直接拒绝，不执行任何代码
+        code_obj = self._compile_code(code)
+        if isinstance(code_obj, str):
+            return code_obj
+
         # 捕获stdout
         old_stdout = sys.stdout
         sys.stdout = captured_output = io.StringIO()
@@ -87,16 +164,16 @@ class PythonExecutorTool(BaseTool):
             exec_globals['__builtins__'] = SAFE_BUILTINS
 
             # 执行代码
-            exec(code, exec_globals, {})
+            exec(code_obj, exec_globals, {})
 
-            # 保存生成的图表
+            # 保存生成的图表，保存后按编号逐个关闭
             fig_paths = []
             for i, fignum in enumerate(plt.get_fignums()):
                 fig = plt.figure(fignum)
                 fig_path = get_output_path(f"chart_{i + 1}.png")
                 fig.savefig(str(fig_path))
                 fig_paths.append(str(fig_path))
-            plt.close('all')
+                plt.close(fignum)
 
             # 获取输出
             output = captured_output.getvalue().strip()
@@ -117,4 +194,6 @@ class PythonExecutorTool(BaseTool):
             return f"代码执行错误：{str(e)}\n详细追踪：{error_detail}"
         finally:
             sys.stdout = old_stdout
-            plt.close('all')
\ No newline at end of file
+            # 仅在执行/保存出错而残留图表时兜底清理
+            if plt.get_fignums():
+                plt.close('all')
\ No newline at end of file
@@ -2,13 +2,48 @@
 """
 Word报告生成工具（支持模板补全、表格插入）
 输入JSON指定sections（heading/paragraph/table）
+表格行一次性拼成 <w:tr> XML 后整体解析插入，避免逐单元格调用 python-docx 的 .text 属性
 """
 
 import json
+import re
+from typing import Any, List
+from xml.sax.saxutils import escape
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 from docx.shared import Inches
 from utils.file_utils import get_output_path, df_to_table_data
-from tools.base_tool import BaseTool
+from tools.base_tool import BaseTool, json_loads
+
+# XML 1.0 不允许的控制字符（\t、\n 单独转换为 <w:tab/>、<w:br/>）
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _cell_xml(value: Any, width: int) -> str:
+    """单元格 <w:tc>，与 python-docx 的 cell.text 赋值效果一致（换行转 <w:br/>，制表符转 <w:tab/>）"""
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    text = text.replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">')
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\n", '</w:t><w:br/><w:t xml:space="preserve">')
+    return (f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+            f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>')
+
+
+def _add_table(doc, table_data: List[List[Any]]):
+    """新增表格：先建空表（保留 python-docx 生成的 tblPr/tblGrid），再整体解析插入所有行"""
+    cols = max(len(row) for row in table_data)
+    table = doc.add_table(rows=0, cols=cols)
+    tbl = table._tbl
+    widths = [grid_col.w.twips for grid_col in tbl.tblGrid.gridCol_lst]
+    rows_xml = "".join(
+        "<w:tr>" + "".join(
+            _cell_xml(row[j] if j < len(row) else "", widths[j]) for j in range(cols)
+        ) + "</w:tr>"
+        for row in table_data
+    )
+    tbl.extend(list(parse_xml(f"<w:tbl {nsdecls('w')}>{rows_xml}</w:tbl>")))
+    return table
+
 
 class WordGeneratorTool(BaseTool):
     name = "word_generator"
@@ -21,7 +56,7 @@ class WordGeneratorTool(BaseTool):
 
     def run(self, input_str: str) -> str:
         try:
-            data = json.loads(input_str)
+            data = json_loads(input_str)
             template_path = data.get("template_path")
             sections = data.get("sections", [])
             output_filename = data.get("output_filename", "report.docx")
@@ -44,12 +79,7 @@ class WordGeneratorTool(BaseTool):
                     table_data = sec.get("data", [])
                     caption = sec.get("caption", "")
                     if table_data:
-                        rows, cols = len(table_data), len(table_data[0])
-                        table = doc.add_table(rows=rows, cols=cols)
-                        for i, row_data in enumerate(table_data):
-                            row_cells = table.rows[i].cells
-                            for j, cell in enumerate(row_data):
-                                row_cells[j].text = str(cell)
+                        _add_table(doc, table_data)
                         if caption:
                             doc.add_paragraph(caption)
 
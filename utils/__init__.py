@@ -8,8 +8,10 @@ utils 包初始化文件
 from .db_utils import (
     get_tables,
     get_table_schema,
+    get_all_schemas,
     execute_query,
     execute_non_query,
+    invalidate_metadata_cache,
 )
 
 from .llm_utils import call_deepseek
@@ -23,8 +25,10 @@ from .file_utils import (
 __all__ = [
     "get_tables",
     "get_table_schema",
+    "get_all_schemas",
     "execute_query",
     "execute_non_query",
+    "invalidate_metadata_cache",
     "call_deepseek",
     "get_output_path",
     "df_to_table_data",
@@ -1,19 +1,26 @@
 # utils/db_utils.py
 """
 数据库工具模块
-每次操作独立创建连接（简单、安全，避免连接池复杂性）
+模块内操作复用每个线程一条长连接（惰性创建，使用前 ping 自动重连），避免每次调用重新建连/认证；
+get_connection() 仍返回独立新连接，供 python_executor 中的用户代码自行管理
 封装常用操作：
 - 获取表格列表
-- 获取表结构
-- 执行查询（返回 list[dict]）
+- 获取表结构（表名/表结构缓存，execute_non_query 后自动清空，也可调用 invalidate_metadata_cache）
+- 批量获取多张表结构（单次 information_schema 查询）
+- 执行查询（返回 list[dict]，可用 max_rows 限制行数并流式读取）
 - 执行非查询语句（INSERT/UPDATE/DELETE）
 后续扩展：支持事务、分页查询等
 """
 
+import contextlib
+import functools
+import threading
 import pymysql
 from typing import List, Dict, Optional, Any, Tuple
 from config import config
 
+_local = threading.local()
+
 def get_connection(cursorclass=pymysql.cursors.DictCursor):
     """创建并返回一个新数据库连接（推荐在上下文管理器中使用）"""
     return pymysql.connect(
@@ -28,33 +35,100 @@ def get_connection(cursorclass=pymysql.cursors.DictCursor):
         autocommit=False,         # 非查询操作需手动 commit
     )
 
+def _get_shared_connection():
+    """
+    获取当前线程复用的连接（首次调用时创建，之后 ping(reconnect=True) 保活/断线重连）
+    保持 autocommit=False：只读操作经 _read_connection() 结束时 rollback，写操作显式 commit
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = get_connection()
+        _local.conn = conn
+    else:
+        conn.ping(reconnect=True)
+    return conn
+
+@contextlib.contextmanager
+def _read_connection():
+    """
+    只读操作使用的共享连接：结束时 rollback，
+    丢弃 SQL 中夹带的写操作，并结束事务（长连接不会一直停留在旧的 REPEATABLE READ 快照上）
+    """
+    conn = _get_shared_connection()
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+
+@functools.lru_cache(maxsize=1)
 def get_tables() -> List[str]:
-    """获取数据库所有表格名"""
-    with get_connection(cursorclass=pymysql.cursors.Cursor) as conn:
-        with conn.cursor() as cursor:
-            cursor.execute("SHOW TABLES")
-            return [row[0] for row in cursor.fetchall()]
+    """获取数据库所有表格名（会话内缓存，DDL 后调用 invalidate_metadata_cache 刷新）"""
+    with _read_connection() as conn, conn.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("SHOW TABLES")
+        return [row[0] for row in cursor.fetchall()]
 
+@functools.lru_cache(maxsize=64)
 def get_table_schema(table_name: str) -> List[Dict[str, Any]]:
-    """获取指定表的字段结构（DESCRIBE）"""
-    with get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(f"DESCRIBE `{table_name}`")
-            return cursor.fetchall()
-
-def execute_query(sql: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
-    """执行SELECT查询，返回 list[dict]"""
-    with get_connection() as conn:
-        with conn.cursor() as cursor:
+    """获取指定表的字段结构（DESCRIBE，按表名 LRU 缓存）"""
+    with _read_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"DESCRIBE `{table_name}`")
+        return cursor.fetchall()
+
+def get_all_schemas(table_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    一次查询批量获取多张表的字段结构（information_schema.COLUMNS），避免逐表 DESCRIBE
+    返回 {表名: [字段dict]}，字段dict 的键与 DESCRIBE 一致（Field/Type/Null/Key/Default/Extra）；
+    不存在的表不会出现在结果中
+    """
+    if not table_names:
+        return {}
+    placeholders = ", ".join(["%s"] * len(table_names))
+    sql = (
+        "SELECT TABLE_NAME, COLUMN_NAME AS `Field`, COLUMN_TYPE AS `Type`, IS_NULLABLE AS `Null`, "
+        "COLUMN_KEY AS `Key`, COLUMN_DEFAULT AS `Default`, EXTRA AS `Extra` "
+        "FROM information_schema.COLUMNS "
+        f"WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders}) "
+        "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+    )
+    schemas: Dict[str, List[Dict[str, Any]]] = {}
+    with _read_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(sql, (config.DATABASE.db_name, *table_names))
+        for row in cursor.fetchall():
+            schemas.setdefault(row.pop("TABLE_NAME"), []).append(row)
+    return schemas
+
+def invalidate_metadata_cache():
+    """清空表名/表结构缓存（执行建表、改表等 DDL 后调用）"""
+    get_tables.cache_clear()
+    get_table_schema.cache_clear()
+
+def execute_query(sql: str, params: Optional[Tuple] = None,
+                  max_rows: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    执行SELECT查询，返回 list[dict]
+    max_rows：最多返回的行数；指定时使用服务端游标（SSDictCursor）流式读取，
+    只取前 max_rows 行，不把完整结果集载入内存
+    结束时 rollback：误传的 INSERT/UPDATE/DELETE 不会生效（写操作请用 execute_non_query）
+    """
+    with _read_connection() as conn:
+        if max_rows is None:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params or ())
+                return cursor.fetchall()
+
+        # 关闭 SSDictCursor 时会丢弃未读取的剩余行，连接可继续复用
+        with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
             cursor.execute(sql, params or ())
-            return cursor.fetchall()
+            return cursor.fetchmany(max_rows)
 
 def execute_non_query(sql: str, params: Optional[Tuple] = None) -> int:
-    """执行INSERT/UPDATE/DELETE，返回受影响行数"""
-    with get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(sql, params or ())
-            conn.commit()
-            return cursor.rowcount
+    """执行INSERT/UPDATE/DELETE（及建表等 DDL），返回受影响行数；执行后清空表名/表结构缓存"""
+    conn = _get_shared_connection()
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params or ())
+        conn.commit()
+        rowcount = cursor.rowcount
+    invalidate_metadata_cache()
+    return rowcount
 
 # 后续可扩展：事务上下文管理器、分页查询等
\ No newline at end of file
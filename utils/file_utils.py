@@ -10,19 +10,23 @@
 后续扩展：日志统一管理、模板路径管理、图片插入辅助等
 """
 
+import os
 from pathlib import Path
 from typing import Union, List, Any
 import pandas as pd
 from config import config
 
+# 输出根目录只解析一次（resolve 需逐级查询文件系统）
+_OUTPUT_ROOT = config.OUTPUT_DIR.resolve()
+
 def get_output_path(filename: str) -> Path:
     """
-    获取标准化输出路径（在 outputs/ 目录下）
-    自动创建必要的子目录
+    获取标准化输出路径（在 outputs/ 目录下，绝对路径，已规范化 .. 等）
+    自动创建必要的子目录（每次都检查：运行中 outputs/ 被删除后也能重建）
     """
-    path = config.OUTPUT_DIR / filename
+    path = Path(os.path.normpath(_OUTPUT_ROOT / filename))
     path.parent.mkdir(parents=True, exist_ok=True)
-    return path.resolve()
+    return path
 
 def df_to_table_data(df: Union[pd.DataFrame, List[List[Any]]]) -> List[List[str]]:
     """
@@ -6,6 +6,7 @@ LLM工具模块（DeepSeek API封装）
 - 简单chat调用（返回纯文本）
 - 支持系统提示、温度、max_tokens自定义
 - 错误处理与重试（基础版）
+- 模块级共享 requests.Session（keep-alive 复用 TCP/TLS 连接，重试策略只挂载一次）
 后续扩展：支持tool calling、streaming、multi-turn历史管理
 """
 import requests
@@ -15,6 +16,12 @@ from typing import List, Dict, Optional
 from config import config
 import json
 
+# 共享会话：复用连接池，避免每次调用重新握手；重试机制：最多3次，重试服务器错误
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(max_retries=Retry(
+    total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504],
+)))
+
 def call_deepseek(
     messages: List[Dict[str, str]],
     temperature: Optional[float] = None,
@@ -40,13 +47,8 @@ def call_deepseek(
     }
 
     try:
-        # 添加重试机制：最多3次，重试服务器错误
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])  # 服务器错误重试
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-
         # 增加超时到60秒
-        response = session.post(
+        response = _SESSION.post(
             url,
             headers=headers,
             json=payload,